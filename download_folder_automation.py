@@ -16,9 +16,12 @@ Usage:
 3. The script will continue running until interrupted with Ctrl+C
 """
 
-from os import scandir, rename, makedirs
-from os.path import splitext, exists, join
+from errno import EXDEV
+from os import replace, scandir, stat, makedirs
+from os.path import basename, dirname, splitext, exists, join, realpath
 from shutil import move
+from stat import S_ISDIR, S_ISREG
+from threading import Lock, Timer
 from time import sleep
 
 import logging
@@ -44,6 +47,14 @@ dest_dir_web = "/Users/wervand/Downloads/web"
 dest_dir_other = "/Users/wervand/Downloads/other"
 dest_dir_folders = "/Users/wervand/Downloads/folders"  # For organizing downloaded folders
 
+# Seconds to wait after the last event before scanning, so a burst of events
+# (e.g. dropping many files at once) is handled in a single pass
+debounce_delay = 0.5
+
+# Seconds between full scans of source_dir that pick up files whose events the
+# observer missed (e.g. during event bursts or on network shares)
+reconcile_interval = 30
+
 def create_directories():
     """Create all necessary directories if they don't exist."""
     directories = [
@@ -75,7 +86,7 @@ image_extensions = [".jpg", ".jpeg", ".jpe", ".jif", ".jfif", ".jfi", ".png", ".
                     ".k25", ".bmp", ".dib", ".heif", ".heic", ".ind", ".indd", ".indt", ".jp2", ".j2k", ".jpf", ".jpf", ".jpx", ".jpm", ".mj2", ".svg", ".svgz", ".ai", ".eps", ".ico"]
 video_extensions = [".webm", ".mpg", ".mp2", ".mpeg", ".mpe", ".mpv", ".ogg",
                     ".mp4", ".mp4v", ".m4v", ".avi", ".wmv", ".mov", ".qt", ".flv", ".swf", ".avchd"]
-audio_extensions = [".m4a", ".flac", "mp3", ".wav", ".wma", ".aac"]
+audio_extensions = [".m4a", ".flac", ".mp3", ".wav", ".wma", ".aac"]
 document_extensions = [".doc", ".docx", ".odt",
                        ".pdf", ".xls", ".xlsx", ".ppt", ".pptx"]
 markdown_extensions = [".md", ".markdown"]
@@ -86,6 +97,62 @@ book_extensions = [".epub", ".mobi"]
 archive_extensions = [".zip", ".rar", ".7z", ".tar", ".gz", ".bz2", ".xz"]
 web_extensions = [".html", ".htm", ".css", ".js", ".php", ".asp", ".jsx", ".tsx"]
 
+# Lowercase extension -> destination directory, built once at import time.
+# Audio maps to the music directory; _process() then decides between sfx and music.
+EXT_MAP = {
+    ext.lower(): dest
+    for ext_list, dest in [
+        (audio_extensions, dest_dir_music),
+        (video_extensions, dest_dir_video),
+        (image_extensions, dest_dir_image),
+        (document_extensions, dest_dir_documents),
+        (python_extensions, dest_dir_python),
+        (rust_extensions, dest_dir_rust),
+        (markdown_extensions, dest_dir_markdown),
+        (app_extensions, dest_dir_apps),
+        (book_extensions, dest_dir_books),
+        (archive_extensions, dest_dir_archives),
+        (web_extensions, dest_dir_web),
+    ]
+    for ext in ext_list
+}
+
+# Distinct extension lengths, longest first, so classify() prefers the longest match
+_EXT_LENGTHS = sorted({len(ext) for ext in EXT_MAP}, reverse=True)
+
+def classify(name_lower):
+    """
+    Find the destination directory for a lowercased filename by its suffix.
+    
+    Matches the same way str.endswith did in the original per-type checks
+    (so a file named ".mp3" still counts as audio), but with one dict lookup
+    per distinct extension length instead of a test per extension.
+    
+    Args:
+        name_lower (str): Lowercased filename
+    
+    Returns:
+        str: Destination directory, or dest_dir_other if no extension matches
+    """
+    for length in _EXT_LENGTHS:
+        dest = EXT_MAP.get(name_lower[-length:])
+        if dest is not None:
+            return dest
+    return dest_dir_other
+
+# Some observers report resolved paths, so match both the configured and the real form
+_SOURCE_DIRS = frozenset({source_dir, realpath(source_dir)})
+
+# Destination directories inside source_dir that must never be moved themselves
+_DEST_DIRS = frozenset(
+    form
+    for directory in [dest_dir_sfx, dest_dir_music, dest_dir_video, dest_dir_image,
+                      dest_dir_documents, dest_dir_python, dest_dir_rust, dest_dir_markdown,
+                      dest_dir_apps, dest_dir_books, dest_dir_archives, dest_dir_web,
+                      dest_dir_other, dest_dir_folders]
+    for form in (directory, realpath(directory))
+)
+
 def make_unique(dest, name):
     """
     Generate a unique filename by adding a counter if the file already exists.
@@ -107,20 +174,27 @@ def make_unique(dest, name):
 def move_file(dest, entry, name):
     """
     Move a file to its destination directory, handling duplicates.
+    If a file with the same name already exists there, the incoming file is
+    given a unique name; the existing file is left untouched.
     
     Args:
         dest (str): Destination directory path
-        entry: File entry object
+        entry (str): Path of the file or folder to move
         name (str): Filename
     """
     try:
-        if exists(f"{dest}/{name}"):
-            unique_name = make_unique(dest, name)
-            oldName = join(dest, name)
-            newName = join(dest, unique_name)
-            rename(oldName, newName)
-        move(entry, dest)
-        logging.info(f"Successfully moved {name} to {dest}")
+        target = join(dest, name)
+        if exists(target):
+            target = join(dest, make_unique(dest, name))
+        try:
+            # A single rename when source and destination share a filesystem, which
+            # they normally do since every destination lives inside source_dir
+            replace(entry, target)
+        except OSError as e:
+            if e.errno != EXDEV:
+                raise
+            move(entry, target)
+        logging.info(f"Successfully moved {name} to {target}")
     except Exception as e:
         logging.error(f"Error moving {name}: {str(e)}")
 
@@ -130,144 +204,132 @@ class MoverHandler(FileSystemEventHandler):
     Monitors the downloads directory and moves files to appropriate locations based on their type.
     """
     
-    def on_modified(self, event):
+    def __init__(self):
+        super().__init__()
+        self._lock = Lock()
+        # Held for a whole drain so two drains never move the same path at once
+        self._drain_lock = Lock()
+        self._timer = None
+        self._reconcile_timer = None
+        self._stopped = False
+        # Paths reported since the last drain; a set so duplicate events collapse
+        self._pending = set()
+
+    def on_created(self, event):
         """
-        Handle file system modification events.
+        Handle file system creation events.
         
         Args:
             event: The file system event that triggered this handler
         """
         logging.info(f"Change detected: {event.src_path}")
+        self._schedule(event.src_path)
+
+    def on_moved(self, event):
+        """
+        Handle file system move events (e.g. a browser renaming a finished download).
+        
+        Args:
+            event: The file system event that triggered this handler
+        """
+        logging.info(f"Change detected: {event.dest_path}")
+        self._schedule(event.dest_path)
+
+    def reconcile(self):
+        """
+        Queue every entry currently in the source directory, then repeat after reconcile_interval.
+        Catches files whose events the observer dropped; entries go through the same debounced drain.
+        """
         try:
             with scandir(source_dir) as entries:
                 for entry in entries:
-                    name = entry.name
-                    logging.info(f"Processing: {name}")
-                    
-                    # Skip the destination directories themselves
-                    if entry.path in [dest_dir_sfx, dest_dir_music, dest_dir_video, dest_dir_image,
-                                    dest_dir_documents, dest_dir_python, dest_dir_rust, dest_dir_markdown,
-                                    dest_dir_apps, dest_dir_books, dest_dir_archives, dest_dir_web,
-                                    dest_dir_other, dest_dir_folders]:
-                        continue
-                    
-                    # Handle directories first
-                    if entry.is_dir():
-                        move_file(dest_dir_folders, entry, name)
-                        continue
-                    
-                    # Process files based on their extensions
-                    if entry.is_file():
-                        if not any([
-                            self.check_audio_files(entry, name),
-                            self.check_video_files(entry, name),
-                            self.check_image_files(entry, name),
-                            self.check_document_files(entry, name),
-                            self.check_python_files(entry, name),
-                            self.check_rust_files(entry, name),
-                            self.check_markdown_files(entry, name),
-                            self.check_app_files(entry, name),
-                            self.check_book_files(entry, name),
-                            self.check_archive_files(entry, name),
-                            self.check_web_files(entry, name)
-                        ]):
-                            # Move to 'other' if no category matches
-                            move_file(dest_dir_other, entry, name)
+                    self._schedule(entry.path)
         except Exception as e:
-            logging.error(f"Error in on_modified: {str(e)}")
-
-    def check_audio_files(self, entry, name):
-        """Check for audio files and move them to appropriate directory based on size and name."""
-        for audio_extension in audio_extensions:
-            if name.lower().endswith(audio_extension.lower()):
-                # Files smaller than 10MB or with 'SFX' in name go to sfx directory
-                if entry.stat().st_size < 10_000_000 or "SFX" in name:
-                    dest = dest_dir_sfx
-                else:
-                    dest = dest_dir_music
-                move_file(dest, entry, name)
-                return True
-        return False
-
-    def check_video_files(self, entry, name):
-        """Check for video files and move them to the video directory."""
-        for video_extension in video_extensions:
-            if name.lower().endswith(video_extension.lower()):
-                move_file(dest_dir_video, entry, name)
-                return True
-        return False
-
-    def check_image_files(self, entry, name):
-        """Check for image files and move them to the image directory."""
-        for image_extension in image_extensions:
-            if name.lower().endswith(image_extension.lower()):
-                move_file(dest_dir_image, entry, name)
-                return True
-        return False
-
-    def check_document_files(self, entry, name):
-        """Check for document files and move them to the documents directory."""
-        for documents_extension in document_extensions:
-            if name.lower().endswith(documents_extension.lower()):
-                move_file(dest_dir_documents, entry, name)
-                return True
-        return False
-
-    def check_python_files(self, entry, name):
-        """Check for Python files and move them to the python directory."""
-        for python_extension in python_extensions:
-            if name.lower().endswith(python_extension.lower()):
-                move_file(dest_dir_python, entry, name)
-                return True
-        return False
-
-    def check_rust_files(self, entry, name):
-        """Check for Rust files and move them to the rust directory."""
-        for rust_extension in rust_extensions:
-            if name.lower().endswith(rust_extension.lower()):
-                move_file(dest_dir_rust, entry, name)
-                return True
-        return False
-
-    def check_markdown_files(self, entry, name):
-        """Check for Markdown files and move them to the markdown directory."""
-        for markdown_extension in markdown_extensions:
-            if name.lower().endswith(markdown_extension.lower()):
-                move_file(dest_dir_markdown, entry, name)
-                return True
-        return False
+            logging.error(f"Error while scanning {source_dir}: {str(e)}")
+        
+        with self._lock:
+            # stop() may have run while we were scanning
+            if self._stopped:
+                return
+            self._reconcile_timer = Timer(reconcile_interval, self.reconcile)
+            self._reconcile_timer.daemon = True
+            self._reconcile_timer.start()
 
-    def check_app_files(self, entry, name):
-        """Check for application files and move them to the apps directory."""
-        for app_extension in app_extensions:
-            if name.lower().endswith(app_extension.lower()):
-                move_file(dest_dir_apps, entry, name)
-                return True
-        return False
+    def stop(self):
+        """Cancel any pending drain and the periodic reconciliation."""
+        with self._lock:
+            self._stopped = True
+            for timer in (self._timer, self._reconcile_timer):
+                if timer is not None:
+                    timer.cancel()
+            self._timer = None
+            self._reconcile_timer = None
 
-    def check_book_files(self, entry, name):
-        """Check for book files and move them to the books directory."""
-        for book_extension in book_extensions:
-            if name.lower().endswith(book_extension.lower()):
-                move_file(dest_dir_books, entry, name)
-                return True
-        return False
+    def _schedule(self, path):
+        """Queue a path and restart the debounce timer so a burst of events is handled in one pass."""
+        # Only direct children of source_dir are ours to sort; this also ignores
+        # the events our own moves produce inside the destination directories
+        if dirname(path) not in _SOURCE_DIRS:
+            return
+        with self._lock:
+            if self._stopped:
+                return
+            self._pending.add(path)
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = Timer(debounce_delay, self._drain)
+            self._timer.daemon = True
+            self._timer.start()
 
-    def check_archive_files(self, entry, name):
-        """Check for archive files and move them to the archives directory."""
-        for archive_extension in archive_extensions:
-            if name.lower().endswith(archive_extension.lower()):
-                move_file(dest_dir_archives, entry, name)
-                return True
-        return False
+    def _drain(self):
+        """Move every queued path to its destination."""
+        # A drain can outlast the debounce delay (e.g. a cross-device copy), so a
+        # later drain waits here; by then paths already moved no longer exist
+        # and _process() skips them instead of copying them again
+        with self._drain_lock:
+            with self._lock:
+                paths, self._pending = self._pending, set()
+                self._timer = None
+            for path in paths:
+                try:
+                    self._process(path)
+                except Exception as e:
+                    logging.error(f"Error processing {path}: {str(e)}")
 
-    def check_web_files(self, entry, name):
-        """Check for web development files and move them to the web directory."""
-        for web_extension in web_extensions:
-            if name.lower().endswith(web_extension.lower()):
-                move_file(dest_dir_web, entry, name)
-                return True
-        return False
+    def _process(self, path):
+        """
+        Classify a single path in the source directory and move it.
+        
+        Args:
+            path (str): Path of the file or folder reported by the observer
+        """
+        name = basename(path)
+        
+        # Skip the destination directories themselves
+        if path in _DEST_DIRS:
+            return
+        logging.info(f"Processing: {name}")
+        
+        try:
+            st = stat(path)
+        except FileNotFoundError:
+            # Already moved by an earlier event, or a temporary file that vanished
+            return
+        
+        # Handle directories first
+        if S_ISDIR(st.st_mode):
+            move_file(dest_dir_folders, path, name)
+            return
+        
+        # Process files based on their extensions
+        if S_ISREG(st.st_mode):
+            # Move to 'other' if no category matches
+            dest = classify(name.lower())
+            if dest == dest_dir_music:
+                # Files smaller than 10MB or with 'SFX' in name go to sfx directory
+                if st.st_size < 10_000_000 or "SFX" in name:
+                    dest = dest_dir_sfx
+            move_file(dest, path, name)
 
 if __name__ == "__main__":
     # Configure logging
@@ -288,11 +350,15 @@ if __name__ == "__main__":
     observer.start()
     logging.info(f"Started monitoring {source_dir}")
     
+    # Sort whatever is already there and keep re-checking in case events are missed
+    event_handler.reconcile()
+    
     # Keep the script running until interrupted
     try:
         while True:
             sleep(1)
     except KeyboardInterrupt:
         observer.stop()
+        event_handler.stop()
         logging.info("Stopping the observer...")
     observer.join()
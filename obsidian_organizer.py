@@ -1,135 +1,255 @@
 #!/usr/bin/env python3
 # script to organize markdown files based on tags 
+# usage: python obsidian_organizer.py [--verbose]
+import atexit
+import logging
 import os
 import re
+import shelve
 import shutil
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-def extract_tags(file_path):
-    """Extract tags from a markdown file."""
+# Tags extracted from each file are cached here between runs, keyed by path and
+# invalidated whenever the file's modification time or size changes
+TAG_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.tag_cache')
+
+# Pattern 1: Standard ***Tags:** [[tag1]] [[tag2]]
+_TAG_HEADER_RE = re.compile(r'\*\*\*Tags:\*\*\s*(\[\[.*?\]\].*?)(?:\n|$)', re.DOTALL)
+# Pattern 2: Just look for [[tag]] anywhere in the file
+_TAG_RE = re.compile(r'\[\[(.*?)\]\]')
+
+# Common date formats: YYYY-MM-DD, YYYY-MM, DD-MM-YYYY and DD-MM-YY
+_DATE_RE = re.compile(r'^(\d{4}-\d{2}(-\d{2})?|\d{2}-\d{2}-\d{2}(\d{2})?)$')
+
+# Number of characters read before falling back to reading the whole file
+TAG_HEADER_READ_SIZE = 4096
+
+_tag_cache = None
+_tag_cache_failed = False
+_tag_cache_lock = threading.Lock()
+
+def _open_tag_cache():
+    """
+    Open the on-disk tag cache on first use and keep it open until exit.
+    Returns None if it cannot be opened; the failure is reported only once.
+    """
+    global _tag_cache, _tag_cache_failed
+    if _tag_cache is None and not _tag_cache_failed:
+        try:
+            _tag_cache = shelve.open(TAG_CACHE_PATH)
+        except Exception as e:
+            _tag_cache_failed = True
+            logging.warning(f"Tag cache unavailable, tags will not be cached: {e}")
+            return None
+        atexit.register(_tag_cache.close)
+    return _tag_cache
+
+def _lookup_cached_tags(file_path):
+    """
+    Look up a file in the tag cache.
+    
+    Returns a (key, stamp, tags) tuple. tags is None on a cache miss; stamp is
+    None if the file cannot be stat()ed, in which case the result must not be stored.
+    """
+    key = os.path.abspath(file_path)
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return key, None, None
+    stamp = (st.st_mtime_ns, st.st_size)
+    
+    with _tag_cache_lock:
+        cache = _open_tag_cache()
+        if cache is None:
+            return key, stamp, None
+        try:
+            entry = cache.get(key)
+        except Exception as e:
+            logging.warning(f"Could not read tag cache for {file_path}: {e}")
+            return key, stamp, None
+    if entry is not None and entry[0] == stamp:
+        return key, stamp, list(entry[1])
+    return key, stamp, None
+
+def _store_cached_tags(key, stamp, tags):
+    """Write extracted tags back to the cache, ignoring (but reporting) failures."""
+    if stamp is None:
+        return
+    with _tag_cache_lock:
+        cache = _open_tag_cache()
+        if cache is None:
+            return
+        try:
+            cache[key] = (stamp, tags)
+        except Exception as e:
+            logging.warning(f"Could not update tag cache for {key}: {e}")
+
+def _move_cached_tags(old_path, new_path):
+    """
+    Re-key a cache entry after its note has been moved, so it keeps hitting at the
+    new location instead of leaving a dead entry behind. A move preserves mtime and
+    size, and the stamp is still checked on lookup.
+    """
+    old_key = os.path.abspath(old_path)
+    with _tag_cache_lock:
+        cache = _open_tag_cache()
+        if cache is None:
+            return
+        try:
+            entry = cache.pop(old_key, None)
+            if entry is not None:
+                cache[os.path.abspath(new_path)] = entry
+        except Exception as e:
+            logging.warning(f"Could not update tag cache for {new_path}: {e}")
+
+def _read_tags(file_path):
+    """
+    Read the tags of a markdown file, bypassing the cache.
+    Returns None (after logging the error) if the file cannot be read.
+    """
     try:
         with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-            
-            # Print the file content for debugging
-            print(f"\nDebug - Content of {os.path.basename(file_path)}:")
-            print(f"First 300 characters: {content[:300]}")
+            # The tag header sits near the top of a note, so try a small read first
+            content = file.read(TAG_HEADER_READ_SIZE)
+            complete = len(content) < TAG_HEADER_READ_SIZE
             
-            # Look for tags with more flexible patterns
-            # Pattern 1: Standard ***Tags:** [[tag1]] [[tag2]]
-            tag_pattern1 = r'\*\*\*Tags:\*\*\s*(\[\[.*?\]\].*?)(?:\n|$)'
-            # Pattern 2: Just look for [[tag]] anywhere in the file
-            tag_pattern2 = r'\[\[(.*?)\]\]'
+            # Accept a header match only if its line ends inside what we have read,
+            # otherwise the tag list may have been cut off at the chunk boundary
+            tag_section = _TAG_HEADER_RE.search(content)
+            if tag_section and (complete or tag_section.end() < len(content)):
+                return _TAG_RE.findall(tag_section.group(1))
             
-            # Try the first pattern
-            tag_section = re.search(tag_pattern1, content, re.DOTALL)
-            if tag_section:
-                tags = re.findall(r'\[\[(.*?)\]\]', tag_section.group(1))
-                print(f"Found tags with pattern 1: {tags}")
-                return tags
+            if not complete:
+                content += file.read()
+                tag_section = _TAG_HEADER_RE.search(content)
+                if tag_section:
+                    return _TAG_RE.findall(tag_section.group(1))
             
-            # If first pattern fails, try just finding all [[tag]] instances
-            tags = re.findall(tag_pattern2, content)
-            if tags:
-                print(f"Found tags with pattern 2: {tags}")
-                return tags
-                
-            print("No tags found in any pattern")
-            return []
+            # If the header is missing, fall back to every [[tag]] in the file
+            return _TAG_RE.findall(content)
     except Exception as e:
-        print(f"Error reading {file_path}: {e}")
-        return []
+        logging.error(f"Error reading {file_path}: {e}")
+        return None
+
+def extract_tags_parallel(file_paths):
+    """
+    Extract tags for many markdown files, memoized on (path, st_mtime_ns, st_size)
+    in the on-disk cache.
+    
+    Uncached files are read on a thread pool, since reading is I/O-bound. The
+    shelf may be tied to the thread that opened it (dbm.sqlite3 on Python 3.13+),
+    so all cache lookups and writes happen on the calling thread. Files that
+    cannot be read get [] and are not cached, so they are retried next run.
+    """
+    results = []
+    missing = []
+    for index, file_path in enumerate(file_paths):
+        key, stamp, tags = _lookup_cached_tags(file_path)
+        results.append(tags)
+        if tags is None:
+            missing.append((index, key, stamp, file_path))
+    
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+            read = list(executor.map(_read_tags, [file_path for *_, file_path in missing]))
+        
+        for (index, key, stamp, _), tags in zip(missing, read):
+            if tags is None:
+                tags = []
+            else:
+                _store_cached_tags(key, stamp, tags)
+            results[index] = tags
+    
+    return results
+
+def extract_tags(file_path):
+    """Extract tags from a markdown file."""
+    return extract_tags_parallel([file_path])[0]
 
 def get_existing_folders(root_dir):
     """Get a dictionary of all existing folders in the directory structure with their depths."""
     folders = {}
     
-    # Walk through the directory structure to find all folders
-    for dirpath, dirnames, _ in os.walk(root_dir):
-        # Skip the source directory itself if it's defined
-        if 'source_dir' in globals() and dirpath == source_dir:
-            continue
-            
-        # Skip .git directories
-        if '.git' in dirpath:
-            continue
-            
-        for dirname in dirnames:
-            folder_path = os.path.join(dirpath, dirname)
-            # Use the folder name as the key
-            folder_name = dirname.lower()
-            
-            # Calculate the depth of this folder (relative to root_dir)
-            path_parts = os.path.relpath(folder_path, root_dir).split(os.sep)
-            depth = len(path_parts)
-            
-            # Store both the path and depth
-            folders[folder_name] = {
-                'path': folder_path,
-                'depth': depth
-            }
+    # Traverse the directory structure with an explicit stack of (path, depth)
+    # pairs; depth is relative to root_dir and grows by one per level.
+    # Children are pushed in reverse so they are visited in the same top-down
+    # order as os.walk, and the same folder wins when two share a name
+    stack = [(root_dir, 0)]
+    while stack:
+        dirpath, depth = stack.pop()
+        subdirs = []
+        # Folders directly inside the source directory are not targets, but
+        # their subfolders still are
+        skip_children = 'source_dir' in globals() and dirpath == source_dir
+        
+        try:
+            with os.scandir(dirpath) as entries:
+                for entry in entries:
+                    # Skip .git directories
+                    if entry.name == '.git' or not entry.is_dir():
+                        continue
+                    
+                    if not skip_children:
+                        # Use the folder name as the key, storing both the path and depth
+                        folders[entry.name.lower()] = {
+                            'path': entry.path,
+                            'depth': depth + 1
+                        }
+                    # Symlinked folders are valid targets, but like os.walk we
+                    # don't descend into them
+                    if not entry.is_symlink():
+                        subdirs.append((entry.path, depth + 1))
+        except OSError as e:
+            logging.error(f"Error scanning {dirpath}: {e}")
+        stack.extend(reversed(subdirs))
     
-    # Debug: print some of the found folders
-    print("\nDebug - Some detected target folders:")
-    count = 0
-    for name, info in folders.items():
-        if "cs" in name.lower() or "terminal" in name.lower():
-            print(f"  - {name}: {info['path']} (depth: {info['depth']})")
-            count += 1
-            if count >= 10:
-                break
+    # Debug: log some of the found folders
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("Some detected target folders:")
+        count = 0
+        for name, info in folders.items():
+            if "cs" in name.lower() or "terminal" in name.lower():
+                logging.debug(f"  - {name}: {info['path']} (depth: {info['depth']})")
+                count += 1
+                if count >= 10:
+                    break
             
     return folders
 
 def is_date_tag(tag):
     """Check if a tag resembles a date format."""
-    # Check for common date formats like YYYY-MM-DD
-    date_patterns = [
-        r'^\d{4}-\d{2}-\d{2}$',  # YYYY-MM-DD
-        r'^\d{4}-\d{2}$',         # YYYY-MM
-        r'^\d{2}-\d{2}-\d{4}$',   # DD-MM-YYYY
-        r'^\d{2}-\d{2}-\d{2}$'    # DD-MM-YY
-    ]
-    
-    for pattern in date_patterns:
-        if re.match(pattern, tag):
-            return True
-    
-    return False
+    return _DATE_RE.match(tag) is not None
 
 def find_best_matching_folder(tags, folders):
     """Find the deepest matching folder for the given tags."""
     matches = []
     
-    print(f"\nDebug - Looking for matches for tags: {tags}")
+    logging.debug(f"Looking for matches for tags: {tags}")
     
     # Remove date-type tags
     non_date_tags = [tag for tag in tags if not is_date_tag(tag)]
     if non_date_tags != tags:
-        print(f"  - Ignoring date tags. Using only: {non_date_tags}")
+        logging.debug(f"  - Ignoring date tags. Using only: {non_date_tags}")
     
     if not non_date_tags:
-        print("  - No non-date tags found to match with folders")
+        logging.debug("  - No non-date tags found to match with folders")
         return None
     
     # Try to find matches for all non-date tags
     for tag in non_date_tags:
-        tag_lower = tag.lower()
-        
-        # Check for matches
-        for folder_name, folder_info in folders.items():
-            match_type = None
-            # Exact match (ignoring case)
-            if tag_lower == folder_name:
-                match_type = "exact"
-                matches.append((folder_info, match_type))
-            # Skip partial matches entirely - they cause too many problems
-                
-            if match_type:
-                print(f"  - Tag '{tag}' {match_type} match with folder '{folder_name}': {folder_info['path']}")
+        # Exact match (ignoring case); folders are already keyed by lowercase name.
+        # Partial matches are skipped entirely - they cause too many problems
+        folder_info = folders.get(tag.lower())
+        if folder_info:
+            match_type = "exact"
+            matches.append((folder_info, match_type))
+            logging.debug(f"  - Tag '{tag}' {match_type} match with folder '{tag.lower()}': {folder_info['path']}")
     
     if not matches:
-        print("  - No matching folders found")
+        logging.debug("  - No matching folders found")
         return None
     
     # Sort matches by depth (deepest first)
@@ -137,14 +257,14 @@ def find_best_matching_folder(tags, folders):
     
     # Return the path of the deepest match
     best_match = matches[0][0]['path']
-    print(f"  - Best match: {best_match}")
+    logging.debug(f"  - Best match: {best_match}")
     return best_match
 
 def sort_markdown_files(source_dir, root_dir):
     """Sort markdown files from a single directory based on their tags."""
     # Get all existing folders for matching
     existing_folders = get_existing_folders(root_dir)
-    print(f"Found {len(existing_folders)} potential target folders.")
+    logging.info(f"Found {len(existing_folders)} potential target folders.")
     
     # Get all markdown files in the specified directory (not subdirectories)
     markdown_files = []
@@ -154,28 +274,29 @@ def sort_markdown_files(source_dir, root_dir):
             if os.path.isfile(file_path):  # Ensure it's a file, not a directory
                 markdown_files.append(file_path)
     
-    print(f"Found {len(markdown_files)} markdown files in {source_dir}.")
+    logging.info(f"Found {len(markdown_files)} markdown files in {source_dir}.")
+    
+    all_tags = extract_tags_parallel(markdown_files)
     
     # Process each file
     moved_count = 0
-    for file_path in markdown_files:
-        print(f"\nProcessing file: {file_path}")
-        tags = extract_tags(file_path)
+    for file_path, tags in zip(markdown_files, all_tags):
+        logging.debug(f"Processing file: {file_path}")
         
         if not tags:
-            print(f"No tags found in {file_path}")
+            logging.debug(f"No tags found in {file_path}")
             continue
         
         # Find the best (deepest) matching folder for all tags
         target_folder = find_best_matching_folder(tags, existing_folders)
         
         if not target_folder:
-            print(f"No matching folder found for tags {tags} in {file_path}. Leaving in place.")
+            logging.debug(f"No matching folder found for tags {tags} in {file_path}. Leaving in place.")
             continue
         
         # If the file is already in the right place, skip it
         if os.path.normpath(os.path.dirname(file_path)) == os.path.normpath(target_folder):
-            print(f"File {file_path} is already in the right location.")
+            logging.debug(f"File {file_path} is already in the right location.")
             continue
         
         # Get the destination path
@@ -192,10 +313,11 @@ def sort_markdown_files(source_dir, root_dir):
         # Move the file
         try:
             shutil.move(file_path, destination)
-            print(f"Moved {file_path} to {destination} based on tags {tags}")
+            _move_cached_tags(file_path, destination)
+            logging.info(f"Moved {file_path} to {destination} based on tags {tags}")
             moved_count += 1
         except Exception as e:
-            print(f"Error moving {file_path}: {e}")
+            logging.error(f"Error moving {file_path}: {e}")
     
     print(f"Sorting complete! Moved {moved_count} files.")
 
@@ -234,6 +356,14 @@ def browse_directories(starting_dir=None):
             print("Invalid choice. Please try again.")
 
 if __name__ == "__main__":
+    # Per-file progress is only shown with --verbose; writing it to the terminal
+    # can dominate the runtime when sorting thousands of notes
+    logging.basicConfig(
+        level=logging.DEBUG if "--verbose" in sys.argv[1:] else logging.WARNING,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    
     print("Welcome to the Markdown Tag Sorter!\n")
     
     # Start from current directory or script location
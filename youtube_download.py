@@ -76,30 +76,27 @@ def download_content(url, download_type="video"):
 
         print(f"\nFetching content from: {url}")
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            # Get video information first
-            info = ydl.extract_info(url, download=False)
+            # Get video information first; process=False skips format resolution,
+            # which process_ie_result() below does once while downloading
+            info = ydl.extract_info(url, download=False, process=False)
             print(f"\nTitle: {info.get('title', 'Unknown')}")
             print(f"Duration: {info.get('duration', 'Unknown')} seconds")
             
             if download_type == "video":
-                formats = info.get('formats', [])
-                # Find the best format that meets our criteria
-                selected_format = next(
-                    (f for f in formats 
-                     if f.get('ext') == 'mp4' 
-                     and f.get('acodec') != 'none' 
-                     and f.get('vcodec') != 'none'
-                     and (f.get('height') or 0) <= 1080),
-                    None
-                )
-                if selected_format:
-                    print(f"Selected quality: {selected_format.get('height', 'Unknown')}p")
+                print("Downloading video (MP4, up to 1080p)")
             else:
                 print("Downloading audio (M4A format)")
                 
-            # Download the content
+            # Download the content, reusing the info fetched above instead of
+            # extracting it again
             print("\nStarting download...")
-            ydl.download([url])
+            try:
+                ydl.process_ie_result(info, download=True)
+            except yt_dlp.utils.ReExtractInfo:
+                # Raised when a stream needs fresh info (e.g. expired DASH URLs);
+                # only download() runs yt-dlp's re-extraction retry loop
+                print("Stream info expired, re-fetching...")
+                ydl.download([url])
             
         print("\nDownload completed successfully!")
         